@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
 import numpy as np
 from math import sqrt
+from itertools import islice
 import sys
 
 def read_rg2(fname):
-    """Read Rg² data from file, ignoring comments."""
-    data = []
+    """Read Rg² data from file, ignoring comments.
+
+    Per-chunk files (packed multi-chain runs) are pooled over all molecules.
+    """
+    if is_chunk_file(fname):
+        return read_rg2_chunks(fname)[1].ravel()
+    return np.fromiter(iter_rg2(fname), dtype=float)
+
+def iter_rg2(fname):
+    """Yield Rg² values of a 'TimeStep v_Rg2' file one line at a time."""
     with open(fname, 'r') as f:
         for line in f:
             s = line.strip()
@@ -15,10 +24,67 @@ def read_rg2(fname):
             # Make sure the line has at least 2 numeric values (TimeStep, v_Rg2)
             if len(parts) >= 2:
                 try:
-                    data.append(float(parts[1]))  # read second column
+                    yield float(parts[1])  # read second column
                 except ValueError:
                     continue
-    return np.array(data, dtype=float)
+
+def is_chunk_file(fname):
+    """True if fname is a fix ave/time 'mode vector' file."""
+    with open(fname, 'r') as f:
+        for line in f:
+            if not line.startswith('#'):
+                break
+            if 'Number-of-rows' in line:
+                return True
+    return False
+
+def iter_chunk_blocks(fname):
+    """Yield (timestep, rows) per block of a fix ave/time 'mode vector' file.
+
+    rows has one line per chunk, without the leading row index. Blocks are
+    read one at a time; a truncated final block is dropped.
+    """
+    with open(fname, 'r') as f:
+        lines = (l.split() for l in f if l.strip() and not l.startswith('#'))
+        for head in lines:
+            step, nrows = int(head[0]), int(head[1])
+            rows = list(islice(lines, nrows))
+            if len(rows) < nrows:
+                return
+            yield step, np.array([r[1:] for r in rows], dtype=float)
+
+def read_rg2_chunks(fname):
+    """Read per-molecule Rg² from a fix ave/time 'mode vector' file.
+
+    Rows hold the gyration/chunk tensor (xx yy zz xy xz yz); Rg² is the sum
+    of columns 1-3.
+    Returns (timesteps, rg2) with rg2 of shape (n_steps, K).
+    """
+    steps, blocks = [], []
+    for step, rows in iter_chunk_blocks(fname):
+        steps.append(step)
+        blocks.append(rows[:, :3].sum(axis=1))
+    return np.array(steps, dtype=int), np.array(blocks, dtype=float)
+
+def split_rg2_chunks(fname, prefix="avg_Rg2_mol"):
+    """Split a per-chunk file into K single-chain series, one file per mol id.
+
+    The series are independent only if inter-molecule pairs were excluded
+    (pack_copies.exclude_inter = True); otherwise the chains interact.
+
+    Output files use the same 'TimeStep v_Rg2' layout read by read_rg2.
+    """
+    steps, rg2 = read_rg2_chunks(fname)
+    names = []
+    for k in range(rg2.shape[1]):
+        name = f"{prefix}{k + 1}.dat"
+        with open(name, 'w') as f:
+            f.write(f"# Rg2 of molecule {k + 1} split from {fname}\n")
+            f.write("# TimeStep v_Rg2\n")
+            for step, val in zip(steps, rg2[:, k]):
+                f.write(f"{step}\t{val:.6f}\n")
+        names.append(name)
+    return names
 
 def bootstrap_mean_confidence(data, nboot=2000, ci=95, rng=None):
     rng = np.random.default_rng(rng)
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Streaming distribution sketches
+===============================
+Mergeable summaries of instantaneous Rg² and shape descriptors (asphericity,
+acylindricity, relative shape anisotropy κ²) so that hundreds of replicas /
+long trajectories can be compared at the distribution level without storing
+every sample.
+
+  FixedHistogram : fixed bins, exact merge (counts just add)
+  TDigest        : merging t-digest quantile sketch, O(compression) memory
+
+Both update incrementally, merge with `merge`, and serialize to small JSON
+files so per-replica sketches can be combined centrally.
+
+Inputs are streamed block by block / frame by frame:
+  * per-chunk gyration tensor files written with fix ave/time N 1 N
+    (gyr_inst_chunks.dat from pack_copies.py) - one sample per chain per step
+  * dump.lammpstrj (+ a .data topology for bonds and mol ids) - the gyration
+    tensor is computed per molecule and frame
+  * avg_Rg2*.dat files, for Rg² only; these are fix ave/time 100 10 1000
+    averages, so their spread is narrower than the instantaneous one
+
+Usage:
+    python sketches.py build  gyr_inst_chunks.dat rep1.json
+    python sketches.py build  dump.lammpstrj rep1.json relaxed.data
+    python sketches.py merge  all.json rep1.json rep2.json ...
+    python sketches.py report all.json
+"""
+
+import json
+import os
+import sys
+import numpy as np
+
+from preprocess import iter_rg2, iter_chunk_blocks, is_chunk_file
+
+# --- Configuration ---
+hist_ranges = {                 # fixed histogram range per quantity
+    'rg2': (0.0, 200.0),
+    'asphericity': (0.0, 200.0),
+    'acylindricity': (0.0, 100.0),
+    'kappa2': (0.0, 1.0),
+}
+hist_bins = 200
+compression = 100
+batch_size = 10000              # values buffered before each update
+# --- End Configuration ---
+
+
+class FixedHistogram:
+    """Fixed-bin histogram with under/overflow counts; merge is exact."""
+
+    def __init__(self, lo, hi, nbins=100):
+        self.lo, self.hi, self.nbins = float(lo), float(hi), int(nbins)
+        self.counts = np.zeros(self.nbins, dtype=np.int64)
+        self.under = 0
+        self.over = 0
+
+    @property
+    def edges(self):
+        return np.linspace(self.lo, self.hi, self.nbins + 1)
+
+    @property
+    def n(self):
+        return int(self.counts.sum()) + self.under + self.over
+
+    def update(self, values):
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        self.under += int(np.count_nonzero(values < self.lo))
+        self.over += int(np.count_nonzero(values >= self.hi))
+        inside = values[(values >= self.lo) & (values < self.hi)]
+        idx = ((inside - self.lo) * (self.nbins / (self.hi - self.lo))).astype(int)
+        self.counts += np.bincount(np.minimum(idx, self.nbins - 1), minlength=self.nbins)
+        return self
+
+    def merge(self, other):
+        if (self.lo, self.hi, self.nbins) != (other.lo, other.hi, other.nbins):
+            raise ValueError("Cannot merge histograms with different bins.")
+        self.counts += other.counts
+        self.under += other.under
+        self.over += other.over
+        return self
+
+    def density(self):
+        """Normalised density over the in-range bins."""
+        inside = self.counts.sum()
+        width = (self.hi - self.lo) / self.nbins
+        return self.counts / (inside * width) if inside else self.counts.astype(float)
+
+    def to_dict(self):
+        return {'kind': 'histogram', 'lo': self.lo, 'hi': self.hi, 'nbins': self.nbins,
+                'counts': self.counts.tolist(), 'under': self.under, 'over': self.over}
+
+    @classmethod
+    def from_dict(cls, d):
+        h = cls(d['lo'], d['hi'], d['nbins'])
+        h.counts = np.array(d['counts'], dtype=np.int64)
+        h.under, h.over = int(d['under']), int(d['over'])
+        return h
+
+
+class TDigest:
+    """Merging t-digest (k1 scale function) for streaming quantiles.
+
+    Keeps at most ~compression centroids; tails are resolved more finely than
+    the median, which is what percentile comparisons of Rg² need.
+    """
+
+    def __init__(self, compression=100, buffer_size=None):
+        self.compression = float(compression)
+        self.buffer_size = int(buffer_size or 10 * compression)
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer = []
+        self._buffered = 0
+
+    @property
+    def n(self):
+        self._flush()
+        return float(self.weights.sum())
+
+    def update(self, values):
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        if values.size == 0:
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._buffer.append(values)
+        self._buffered += values.size
+        if self._buffered >= self.buffer_size:
+            self._flush()
+        return self
+
+    def merge(self, other):
+        other._flush()
+        self._flush()
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]),
+                       np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        values = np.concatenate(self._buffer)
+        self._buffer, self._buffered = [], 0
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(len(values))]))
+
+    def _k(self, q):
+        return self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+
+    def _k_inv(self, k):
+        return (np.sin(k * 2 * np.pi / self.compression) + 1) / 2
+
+    def _compress(self, means, weights):
+        if len(means) == 0:
+            return
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        out_m, out_w = [], []
+        cur_m, cur_w = means[0], weights[0]
+        q0 = 0.0
+        q_limit = self._k_inv(min(self._k(q0) + 1, self.compression / 4)) * total
+        for m, w in zip(means[1:], weights[1:]):
+            if q0 * total + cur_w + w <= q_limit:
+                cur_m += (m - cur_m) * w / (cur_w + w)
+                cur_w += w
+            else:
+                out_m.append(cur_m)
+                out_w.append(cur_w)
+                q0 += cur_w / total
+                q_limit = self._k_inv(min(self._k(q0) + 1, self.compression / 4)) * total
+                cur_m, cur_w = m, w
+        out_m.append(cur_m)
+        out_w.append(cur_w)
+        self.means = np.array(out_m)
+        self.weights = np.array(out_w)
+
+    def _knots(self):
+        self._flush()
+        cum = np.cumsum(self.weights) - self.weights / 2
+        x = np.concatenate([[self.min], self.means, [self.max]])
+        c = np.concatenate([[0.0], cum, [self.weights.sum()]])
+        return x, c / c[-1]
+
+    def quantile(self, q):
+        """Approximate quantile(s) for q in [0, 1]."""
+        if self.n == 0:
+            return np.nan * np.asarray(q, dtype=float)
+        x, c = self._knots()
+        return np.interp(q, c, x)
+
+    def cdf(self, x):
+        """Approximate P(X <= x)."""
+        if self.n == 0:
+            return np.nan * np.asarray(x, dtype=float)
+        xs, c = self._knots()
+        return np.interp(x, xs, c)
+
+    def to_dict(self):
+        self._flush()
+        return {'kind': 'tdigest', 'compression': self.compression,
+                'min': self.min, 'max': self.max,
+                'means': np.round(self.means, 8).tolist(), 'weights': self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        t = cls(d['compression'])
+        t.min, t.max = float(d['min']), float(d['max'])
+        t.means = np.array(d['means'], dtype=float)
+        t.weights = np.array(d['weights'], dtype=float)
+        return t
+
+
+_KINDS = {'histogram': FixedHistogram, 'tdigest': TDigest}
+
+
+def save_sketches(filename, sketches):
+    """Write a {name: sketch} dict as compact JSON."""
+    with open(filename, 'w') as f:
+        json.dump({name: s.to_dict() for name, s in sketches.items()}, f, separators=(',', ':'))
+
+
+def load_sketches(filename):
+    """Read a {name: sketch} dict written by save_sketches."""
+    with open(filename, 'r') as f:
+        raw = json.load(f)
+    return {name: _KINDS[d['kind']].from_dict(d) for name, d in raw.items()}
+
+
+def merge_sketch_files(filenames):
+    """Merge per-replica sketch files name by name."""
+    merged = load_sketches(filenames[0])
+    for fname in filenames[1:]:
+        for name, s in load_sketches(fname).items():
+            if name in merged:
+                merged[name].merge(s)
+            else:
+                merged[name] = s
+    return merged
+
+
+def shape_descriptors(tensors):
+    """Rg², asphericity b, acylindricity c and κ² from gyration tensors.
+
+    tensors has rows (xx yy zz xy xz yz). With eigenvalues l1 >= l2 >= l3:
+    b = l1 - (l2 + l3)/2, c = l2 - l3, κ² = (b² + 3c²/4) / Rg⁴.
+    """
+    t = np.atleast_2d(tensors)
+    T = np.empty((len(t), 3, 3))
+    T[:, 0, 0], T[:, 1, 1], T[:, 2, 2] = t[:, 0], t[:, 1], t[:, 2]
+    T[:, 0, 1] = T[:, 1, 0] = t[:, 3]
+    T[:, 0, 2] = T[:, 2, 0] = t[:, 4]
+    T[:, 1, 2] = T[:, 2, 1] = t[:, 5]
+    lam = np.linalg.eigvalsh(T)[:, ::-1]
+    rg2 = lam.sum(axis=1)
+    b = lam[:, 0] - 0.5 * (lam[:, 1] + lam[:, 2])
+    c = lam[:, 1] - lam[:, 2]
+    return {'rg2': rg2, 'asphericity': b, 'acylindricity': c,
+            'kappa2': (b ** 2 + 0.75 * c ** 2) / rg2 ** 2}
+
+
+def gyration_tensors(pos, mol):
+    """Per-molecule gyration tensors (xx yy zz xy xz yz) of unwrapped positions."""
+    _, inv, counts = np.unique(mol, return_inverse=True, return_counts=True)
+    com = np.column_stack([np.bincount(inv, pos[:, k]) for k in range(3)]) / counts[:, None]
+    d = pos - com[inv]
+    pairs = ((0, 0), (1, 1), (2, 2), (0, 1), (0, 2), (1, 2))
+    return np.column_stack([np.bincount(inv, d[:, i] * d[:, j]) for i, j in pairs]) / counts[:, None]
+
+
+class ShapeSketches:
+    """Histogram + t-digest per quantity, fed incrementally."""
+
+    def __init__(self, quantities=tuple(hist_ranges)):
+        self.sketches = {}
+        for q in quantities:
+            lo, hi = hist_ranges[q]
+            self.sketches[f'{q}_hist'] = FixedHistogram(lo, hi, hist_bins)
+            self.sketches[f'{q}_tdigest'] = TDigest(compression)
+
+    def update(self, quantity, values):
+        self.sketches[f'{quantity}_hist'].update(values)
+        self.sketches[f'{quantity}_tdigest'].update(values)
+
+    def update_tensors(self, tensors):
+        for q, values in shape_descriptors(tensors).items():
+            if f'{q}_hist' in self.sketches:
+                self.update(q, values)
+
+
+def sketch_chunk_file(fname, sk):
+    """Stream a per-chunk gyration tensor file block by block."""
+    for _, rows in iter_chunk_blocks(fname):
+        if rows.shape[1] >= 6:
+            sk.update_tensors(rows[:, :6])
+        else:
+            sk.update('rg2', rows[:, :3].sum(axis=1))
+
+
+def sketch_dump_file(fname, topology_file, sk):
+    """Stream dump frames, computing the gyration tensor per molecule."""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'render'))
+    from render_frames import load_topology, bfs_levels, unwrap, iter_frames
+
+    topo = load_topology(topology_file)
+    levels = bfs_levels(len(topo['ids']), topo['bonds'])
+    for _, pos, box, wrapped in iter_frames(fname, topo['ids']):
+        if wrapped:
+            pos = unwrap(pos, box, levels)
+        sk.update_tensors(gyration_tensors(pos, topo['mol']))
+
+
+def sketch_rg2_file(fname, sk):
+    """Stream a 'TimeStep v_Rg2' file (time-averaged values) in batches."""
+    print(f"Note: '{fname}' holds fix ave/time averages, not instantaneous Rg².")
+    batch = []
+    for value in iter_rg2(fname):
+        batch.append(value)
+        if len(batch) >= batch_size:
+            sk.update('rg2', batch)
+            batch = []
+    if batch:
+        sk.update('rg2', batch)
+
+
+def build_sketches(fname, topology_file=None):
+    """Pick the streaming reader for fname and return {name: sketch}."""
+    if fname.endswith('.lammpstrj'):
+        if topology_file is None:
+            print("❌ Error: dump files need a .data topology for bonds and mol ids.")
+            sys.exit(1)
+        sk = ShapeSketches()
+        sketch_dump_file(fname, topology_file, sk)
+    elif is_chunk_file(fname):
+        sk = ShapeSketches()
+        sketch_chunk_file(fname, sk)
+    else:
+        sk = ShapeSketches(('rg2',))
+        sketch_rg2_file(fname, sk)
+    # drop descriptors that received no data (e.g. Rg²-only chunk files)
+    return {name: s for name, s in sk.sketches.items() if s.n}
+
+
+def check_ranges(sketches):
+    """Warn about samples that fell outside the fixed histogram range."""
+    for name, s in sketches.items():
+        if isinstance(s, FixedHistogram) and (s.under or s.over):
+            print(f"Warning: {name}: {s.under} samples below {s.lo:g} and {s.over} above "
+                  f"{s.hi:g} are not binned; widen hist_ranges.")
+
+
+def report(sketches, qs=(0.025, 0.25, 0.5, 0.75, 0.975)):
+    for name, s in sketches.items():
+        if isinstance(s, TDigest):
+            qv = ", ".join(f"q{q:g}={v:.4f}" for q, v in zip(qs, s.quantile(qs)))
+            print(f"{name}: n={s.n:.0f}, min={s.min:.4f}, max={s.max:.4f}, {qv}")
+        else:
+            print(f"{name}: n={s.n}, bins={s.nbins} on [{s.lo:g}, {s.hi:g}), "
+                  f"under={s.under}, over={s.over}")
+    check_ranges(sketches)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == 'build':
+        topology = sys.argv[4] if len(sys.argv) >= 5 else None
+        sketches = build_sketches(sys.argv[2], topology)
+        save_sketches(sys.argv[3], sketches)
+        check_ranges(sketches)
+        print(f"Sketches written to {sys.argv[3]}")
+    elif len(sys.argv) >= 4 and sys.argv[1] == 'merge':
+        merged = merge_sketch_files(sys.argv[3:])
+        save_sketches(sys.argv[2], merged)
+        report(merged)
+    elif len(sys.argv) >= 3 and sys.argv[1] == 'report':
+        report(load_sketches(sys.argv[2]))
+    else:
+        print(__doc__)
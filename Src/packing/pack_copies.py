@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Multi-copy packing
+==================
+Replicates a single-chain topology K times into one LAMMPS data file so that
+K chains are simulated in one job. Each copy gets its own mol id, a random
+rotation and a random cell on a cubic lattice. A matching input script is
+written that excludes inter-molecule pair interactions and records the
+per-molecule gyration tensor through compute gyration/chunk.
+
+With exclude_inter = True the chains never interact, so the K series are
+independent. With exclude_inter = False chains only start beyond cutoff +
+skin; they diffuse into each other during the run, interact, and the K
+series become correlated (pooled errors are then underestimated).
+
+Split the per-chunk output back into K series with preprocess.split_rg2_chunks.
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'theta shape'))
+from visualize_ovito import parse_lammps_data
+
+# --- Configuration ---
+input_data_file = '../theta shape/curr.lammps'   # single-chain topology
+packed_data_file = 'packed.data'                 # output data file
+packed_input_file = 'packed.lammps'              # output input script
+n_copies = 64                                    # K chains per job
+exclude_inter = True                             # no pair forces between chains (False: chains correlate)
+pair_cutoff = 8.0                                # lj/cut cutoff in the input script
+neighbor_skin = 1.0                              # neighbor skin in the input script
+seed = 12345                                     # rotation / placement seed
+# --- End Configuration ---
+
+
+def random_rotation(rng):
+    """Uniformly distributed random 3x3 rotation matrix."""
+    q, r = np.linalg.qr(rng.normal(size=(3, 3)))
+    q *= np.sign(np.diag(r))
+    if np.linalg.det(q) < 0:
+        q[:, 0] *= -1
+    return q
+
+
+def pack_copies(atoms, bonds, k, spacing, rng=None):
+    """Place k rotated copies of one chain on a cubic lattice.
+
+    Cells are 2*radius + spacing wide, so copies never start closer than
+    `spacing`. Returns (atoms, bonds, box_length).
+    """
+    rng = np.random.default_rng(rng)
+    pos = np.array([a['pos'] for a in atoms])
+    pos = pos - pos.mean(axis=0)
+    radius = np.max(np.linalg.norm(pos, axis=1))
+    cell = 2.0 * radius + spacing
+
+    n_side = int(np.ceil(k ** (1.0 / 3.0) - 1e-9))
+    grid = np.array([(i, j, l) for i in range(n_side)
+                     for j in range(n_side) for l in range(n_side)], dtype=float)
+    cells = rng.permutation(len(grid))[:k]
+    box = n_side * cell
+
+    n_atoms = len(atoms)
+    id_map = {a['id']: i + 1 for i, a in enumerate(atoms)}
+    new_atoms, new_bonds = [], []
+    for mol in range(k):
+        centre = (grid[cells[mol]] + 0.5) * cell - 0.5 * box
+        rotated = pos @ random_rotation(rng).T + centre
+        offset = mol * n_atoms
+        for a, p in zip(atoms, rotated):
+            new_atoms.append({'id': offset + id_map[a['id']], 'mol': mol + 1,
+                              'type': a['type'], 'pos': p})
+        for b in bonds:
+            new_bonds.append({'id': len(new_bonds) + 1, 'type': b['type'],
+                              'a1': offset + id_map[b['a1']],
+                              'a2': offset + id_map[b['a2']]})
+
+    return new_atoms, new_bonds, box
+
+
+def write_packed_data(filename, atoms, bonds, box, k):
+    """Write packed multi-chain data file (atom_style bond)."""
+    n_atom_types = max(a['type'] for a in atoms)
+    n_bond_types = max(b['type'] for b in bonds) if bonds else 1
+    half = 0.5 * box
+    with open(filename, 'w') as f:
+        f.write(f"LAMMPS data file - {k} packed copies\n\n")
+        f.write(f"{len(atoms)} atoms\n{len(bonds)} bonds\n0 angles\n\n")
+        f.write(f"{n_atom_types} atom types\n{n_bond_types} bond types\n\n")
+        for axis in ('x', 'y', 'z'):
+            f.write(f"{-half:.4f} {half:.4f} {axis}lo {axis}hi\n")
+
+        f.write("\nMasses\n\n")
+        for t in range(1, n_atom_types + 1):
+            f.write(f"{t} 1.00\n")
+
+        f.write("\nAtoms # bond\n\n")
+        for a in atoms:
+            x, y, z = a['pos']
+            f.write(f"{a['id']} {a['mol']} {a['type']} {x:.6f} {y:.6f} {z:.6f}\n")
+
+        f.write("\nBonds # bond\n\n")
+        for b in bonds:
+            f.write(f"{b['id']} {b['type']} {b['a1']} {b['a2']}\n")
+
+    print(f"✅ Created '{filename}' with {k} copies, {len(atoms)} atoms and "
+          f"{len(bonds)} bonds (box {box:.2f}).")
+
+
+def write_input_script(filename, data_file, exclude, cutoff=8.0, skin=1.0,
+                       rg_file='rg2_chunks.dat', inst_file='gyr_inst_chunks.dat'):
+    """Write the LAMMPS input for a packed system.
+
+    Same protocol as spectacle.lammps. All six gyration/chunk tensor
+    components (xx yy zz xy xz yz) are recorded per molecule: Rg² is the
+    trace, which stays exact under fix ave/time averaging, and the full
+    tensor keeps shape descriptors recoverable. A second, unaveraged copy
+    (inst_file) feeds the instantaneous distributions in sketches.py.
+    """
+    exclude_line = "neigh_modify    exclude molecule/inter all\n" if exclude else ""
+    with open(filename, 'w') as f:
+        f.write(f"""# Packed multi-chain simulation (harmonic bonds + LJ excluded volume)
+units       real
+dimension   3
+atom_style  bond
+boundary    p p p
+
+log             log.packed
+
+# ==== Input Structure ====
+read_data       {data_file}
+
+# ==== Interactions ====
+pair_style      lj/cut {cutoff}
+pair_coeff      * * 0.1 3.0
+
+bond_style      harmonic
+bond_coeff      * 300.0 1.2
+
+neighbor        {skin} bin
+neigh_modify    delay 0 every 1 check yes
+{exclude_line}
+# ==== Soft warm-up to avoid blow-up ====
+pair_style      soft 5.0
+pair_coeff      * * 5.0
+fix             warm all adapt 1 pair soft a * * v_f
+
+variable        f equal ramp(0,1)
+run             2000
+unfix warm
+
+# Switch back to LJ after warm-up
+pair_style      lj/cut {cutoff}
+pair_coeff      * * 0.1 3.0
+
+# ==== Energy Minimization ====
+reset_timestep 0
+min_style cg
+minimize 1.0e-6 1.0e-8 5000 10000
+
+# ==== Equilibration ====
+velocity all create 300.0 12345 mom yes rot yes dist gaussian
+fix       1 all nvt temp 300.0 300.0 100.0
+
+print "=== STARTING EQUILIBRATION RUN ==="
+run         100000
+print "=== EQUILIBRATION FINISHED ==="
+
+# ==== Per-molecule Rg^2 ====
+compute     mol all chunk/atom molecule
+compute     rgchunk all gyration/chunk mol tensor
+
+fix         rgavg all ave/time 100 10 1000 c_rgchunk[1] c_rgchunk[2] c_rgchunk[3] c_rgchunk[4] c_rgchunk[5] c_rgchunk[6] mode vector file {rg_file}
+# instantaneous samples (no averaging) for the distribution sketches
+fix         rginst all ave/time 1000 1 1000 c_rgchunk[1] c_rgchunk[2] c_rgchunk[3] c_rgchunk[4] c_rgchunk[5] c_rgchunk[6] mode vector file {inst_file}
+
+# ==== Output ====
+dump        1 all custom 100 dump.lammpstrj id mol type x y z
+thermo_style custom step temp pe ke etotal press
+thermo      1000
+
+run         500000
+
+# ==== Save relaxed structure ====
+write_data  relaxed_packed.data
+""")
+    print(f"✅ Created '{filename}' (inter-molecule pairs {'excluded' if exclude else 'kept'}).")
+
+
+# --- Main ---
+if __name__ == "__main__":
+    print(f"Parsing '{input_data_file}'...")
+    data = parse_lammps_data(input_data_file)
+
+    # without exclusion, keep chains beyond cutoff + skin at the start
+    spacing = 2.0 if exclude_inter else pair_cutoff + neighbor_skin
+    print(f"Packing {n_copies} copies...")
+    atoms, bonds, box = pack_copies(data['atoms'], data['bonds'], n_copies, spacing, rng=seed)
+    write_packed_data(packed_data_file, atoms, bonds, box, n_copies)
+    write_input_script(packed_input_file, packed_data_file, exclude_inter,
+                       pair_cutoff, neighbor_skin)
+    if not exclude_inter:
+        print("Warning: chains interact once they diffuse together; "
+              "the per-molecule series are not independent.")
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Headless snapshot / movie renderer
+==================================
+Draws bead-and-bond projections of LAMMPS .data files and dump.lammpstrj
+frames with NumPy + matplotlib (Agg backend, no GUI needed). Frames are
+rendered in parallel across a process pool into numbered PNGs, which are
+optionally stitched into a movie with ffmpeg.
+
+Examples:
+    python render_frames.py ../Results/results_shape/relaxed.data
+    python render_frames.py dump.lammpstrj --topology curr.lammps --stop 5000 --movie qc.mp4
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+from collections import deque
+from multiprocessing import Pool
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'theta shape'))
+from visualize_ovito import parse_lammps_data
+
+# --- Configuration ---
+output_dir = 'frames'          # numbered PNGs go here
+image_size = 4.0               # inches (square)
+dpi = 100
+bead_size = 30.0
+bond_width = 1.5
+fps = 25
+# --- End Configuration ---
+
+AXES = {'xy': (0, 1, 2), 'xz': (0, 2, 1), 'yz': (1, 2, 0)}
+
+
+# ---------------- Topology ----------------
+
+def load_topology(filename):
+    """Read atoms/bonds from a .data file into index arrays.
+
+    Returns dict with ids (sorted), types, mol ids, pos, bonds (0-based
+    index pairs) and junction degree per atom.
+    """
+    data = parse_lammps_data(filename)
+    atoms = sorted(data['atoms'], key=lambda a: a['id'])
+    ids = np.array([a['id'] for a in atoms], dtype=int)
+    index = {i: k for k, i in enumerate(ids)}
+    bonds = np.array([(index[b['a1']], index[b['a2']]) for b in data['bonds']],
+                     dtype=int).reshape(-1, 2)
+    degree = np.bincount(bonds.ravel(), minlength=len(ids))
+    return {
+        'ids': ids,
+        'types': np.array([a['type'] for a in atoms], dtype=int),
+        'mol': np.array([a['mol'] for a in atoms], dtype=int),
+        'pos': np.array([a['pos'] for a in atoms], dtype=float),
+        'bonds': bonds,
+        'degree': degree,
+    }
+
+
+def bfs_levels(n_atoms, bonds):
+    """Group bond-tree edges by BFS depth so unwrapping vectorises per level."""
+    adj = [[] for _ in range(n_atoms)]
+    for i, j in bonds:
+        adj[i].append(j)
+        adj[j].append(i)
+    seen = np.zeros(n_atoms, dtype=bool)
+    levels = []
+    for root in range(n_atoms):
+        if seen[root]:
+            continue
+        seen[root] = True
+        queue, depth = deque([(root, 0)]), {}
+        while queue:
+            u, d = queue.popleft()
+            for v in adj[u]:
+                if not seen[v]:
+                    seen[v] = True
+                    depth.setdefault(d, []).append((u, v))
+                    queue.append((v, d + 1))
+        for d, edges in depth.items():
+            while len(levels) <= d:
+                levels.append([])
+            levels[d].extend(edges)
+    return [np.array(e, dtype=int) for e in levels]
+
+
+def unwrap(pos, box, levels):
+    """Make molecules whole by walking bonds with the minimum image."""
+    pos = pos.copy()
+    for edges in levels:
+        p, c = edges[:, 0], edges[:, 1]
+        d = pos[c] - pos[p]
+        d -= box * np.round(d / box)
+        pos[c] = pos[p] + d
+    return pos
+
+
+# ---------------- Trajectory ----------------
+
+def index_frames(filename):
+    """Byte offsets of every 'ITEM: TIMESTEP' line in a dump file."""
+    offsets = []
+    with open(filename, 'rb') as f:
+        pos = f.tell()
+        line = f.readline()
+        while line:
+            if line.startswith(b'ITEM: TIMESTEP'):
+                offsets.append(pos)
+            pos = f.tell()
+            line = f.readline()
+    return offsets
+
+
+def read_frame(filename, offset, ids):
+    """Read one dump frame; returns (timestep, pos ordered like ids, box, wrapped)."""
+    with open(filename, 'r') as f:
+        f.seek(offset)
+        return _parse_frame(f, ids)
+
+
+def iter_frames(filename, ids):
+    """Stream dump frames one at a time (same tuples as read_frame)."""
+    with open(filename, 'r') as f:
+        while f.readline().startswith('ITEM: TIMESTEP'):
+            yield _parse_frame(f, ids, header_read=True)
+
+
+def _parse_frame(f, ids, header_read=False):
+    if not header_read:
+        f.readline()
+    step = int(f.readline())
+    f.readline()
+    n = int(f.readline())
+    f.readline()
+    bounds = np.array([[float(v) for v in f.readline().split()[:2]] for _ in range(3)])
+    cols = f.readline().split()[2:]
+    rows = np.array([f.readline().split() for _ in range(n)], dtype=float)
+
+    col = {c: k for k, c in enumerate(cols)}
+    box = bounds[:, 1] - bounds[:, 0]
+    if 'xu' in col:
+        xyz, wrapped = rows[:, [col['xu'], col['yu'], col['zu']]], False
+    else:
+        xyz, wrapped = rows[:, [col['x'], col['y'], col['z']]], True
+        if 'ix' in col:
+            xyz = xyz + rows[:, [col['ix'], col['iy'], col['iz']]] * box
+            wrapped = False
+
+    pos = np.empty((len(ids), 3))
+    order = np.searchsorted(ids, rows[:, col['id']].astype(int))
+    pos[order] = xyz
+    return step, pos, box, wrapped
+
+
+# ---------------- Drawing ----------------
+
+def atom_colours(topo, colour_by):
+    """Colour per atom: by type, or by junction degree (1 = end, 2 = chain, 3+ = junction)."""
+    cmap = plt.get_cmap('tab10')
+    if colour_by == 'degree':
+        key = np.clip(topo['degree'], 0, 4)
+    else:
+        key = topo['types']
+    return cmap(key % 10)
+
+
+def draw(pos, topo, colours, plane, extent, title, filename):
+    """Render one projected snapshot to a PNG."""
+    i, j, k = AXES[plane]
+    xy = pos[:, [i, j]]
+
+    fig = plt.figure(figsize=(image_size, image_size), dpi=dpi)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    ax.set_aspect('equal')
+    ax.axis('off')
+
+    segments = xy[topo['bonds']]
+    ax.add_collection(LineCollection(segments, colors='0.4', linewidths=bond_width, zorder=1))
+    order = np.argsort(pos[:, k])   # far beads first
+    ax.scatter(xy[order, 0], xy[order, 1], s=bead_size, c=colours[order],
+               edgecolors='k', linewidths=0.3, zorder=2)
+    if title:
+        ax.text(0.02, 0.98, title, transform=ax.transAxes, va='top', fontsize=8)
+
+    fig.savefig(filename, dpi=dpi)
+    plt.close(fig)
+
+
+def view_extent(pos, plane, pad=2.0):
+    """Square window around the projected positions."""
+    i, j, _ = AXES[plane]
+    lo = pos[:, [i, j]].min(axis=0)
+    hi = pos[:, [i, j]].max(axis=0)
+    mid = 0.5 * (lo + hi)
+    half = 0.5 * np.max(hi - lo) + pad
+    return (mid[0] - half, mid[0] + half, mid[1] - half, mid[1] + half)
+
+
+# ---------------- Parallel workers ----------------
+
+_worker = {}
+
+
+def _init_worker(dump_file, topo, levels, colours, plane, half, out_dir):
+    _worker.update(dump_file=dump_file, topo=topo, levels=levels, colours=colours,
+                   plane=plane, half=half, out_dir=out_dir)
+
+
+def _render_one(job):
+    n, offset = job
+    w = _worker
+    step, pos, box, wrapped = read_frame(w['dump_file'], offset, w['topo']['ids'])
+    if wrapped:
+        pos = unwrap(pos, box, w['levels'])
+    i, j, _ = AXES[w['plane']]
+    c = pos.mean(axis=0)
+    extent = (c[i] - w['half'], c[i] + w['half'], c[j] - w['half'], c[j] + w['half'])
+    filename = os.path.join(w['out_dir'], f"frame_{n:05d}.png")
+    draw(pos, w['topo'], w['colours'], w['plane'], extent, f"step {step}", filename)
+    return filename
+
+
+def render_trajectory(dump_file, topology_file, start=0, stop=None, every=1,
+                      plane='xy', colour_by='type', out_dir=output_dir, nproc=None):
+    """Render dump frames [start:stop:every] in parallel; returns PNG paths."""
+    topo = load_topology(topology_file)
+    levels = bfs_levels(len(topo['ids']), topo['bonds'])
+    colours = atom_colours(topo, colour_by)
+    offsets = index_frames(dump_file)[start:stop:every]
+    if not offsets:
+        print(f"❌ Error: no frames selected in '{dump_file}'.")
+        sys.exit(1)
+
+    # fixed window (from the first selected frame) so the movie does not jitter
+    _, pos0, box0, wrapped = read_frame(dump_file, offsets[0], topo['ids'])
+    if wrapped:
+        pos0 = unwrap(pos0, box0, levels)
+    extent0 = view_extent(pos0 - pos0.mean(axis=0), plane)
+    half = 1.25 * max(abs(v) for v in extent0)
+
+    # stale frames from a longer earlier render would end up in the movie
+    os.makedirs(out_dir, exist_ok=True)
+    for old in glob.glob(os.path.join(out_dir, 'frame_*.png')):
+        os.remove(old)
+    jobs = list(enumerate(offsets))
+    with Pool(nproc, initializer=_init_worker,
+              initargs=(dump_file, topo, levels, colours, plane, half, out_dir)) as pool:
+        files = pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // (8 * (nproc or os.cpu_count() or 1))))
+    print(f"✅ Rendered {len(files)} frames into '{out_dir}/'.")
+    return files
+
+
+def render_data(data_file, plane='xy', colour_by='type', filename=None):
+    """Render a single snapshot of a .data file."""
+    topo = load_topology(data_file)
+    colours = atom_colours(topo, colour_by)
+    filename = filename or os.path.splitext(os.path.basename(data_file))[0] + '.png'
+    draw(topo['pos'], topo, colours, plane, view_extent(topo['pos'], plane),
+         os.path.basename(data_file), filename)
+    print(f"✅ Rendered '{data_file}' -> '{filename}'.")
+    return filename
+
+
+def make_movie(out_dir, movie_file, rate=fps):
+    """Stitch frame_XXXXX.png into a movie with ffmpeg (if installed)."""
+    if shutil.which('ffmpeg') is None:
+        print("ffmpeg not found; PNG frames kept, movie skipped.")
+        return None
+    subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-framerate', str(rate),
+                    '-i', os.path.join(out_dir, 'frame_%05d.png'),
+                    '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+                    movie_file], check=True)
+    print(f"✅ Movie written to '{movie_file}'.")
+    return movie_file
+
+
+# --- Main ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless bead-and-bond renderer")
+    parser.add_argument('input', help=".data file or dump.lammpstrj")
+    parser.add_argument('--topology', help=".data file with bonds (required for dumps)")
+    parser.add_argument('--plane', choices=sorted(AXES), default='xy')
+    parser.add_argument('--colour-by', choices=('type', 'degree'), default='type')
+    parser.add_argument('--start', type=int, default=0)
+    parser.add_argument('--stop', type=int, default=None)
+    parser.add_argument('--every', type=int, default=1)
+    parser.add_argument('--nproc', type=int, default=None)
+    parser.add_argument('--out-dir', default=output_dir)
+    parser.add_argument('--movie', help="movie file name (needs ffmpeg)")
+    args = parser.parse_args()
+
+    if args.input.endswith('.lammpstrj'):
+        if not args.topology:
+            parser.error("--topology is required for dump files")
+        render_trajectory(args.input, args.topology, args.start, args.stop, args.every,
+                          args.plane, args.colour_by, args.out_dir, args.nproc)
+        if args.movie:
+            make_movie(args.out_dir, args.movie)
+    else:
+        render_data(args.input, args.plane, args.colour_by)
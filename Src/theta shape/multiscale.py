@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Coarse-to-fine equilibration
+============================
+Instead of equilibrating every resolution from the planar arc embedding,
+equilibrate a coarse skeleton cheaply, then refine: trace each edge of the
+relaxed structure (junction to junction), insert beads uniformly along the
+relaxed path, and hand the result to the next level as its starting
+configuration.
+
+After each level's NVT run, the Rg² series (eq_Rg2_N.dat) is checked for
+drift between the last two quarters, with errors from its autocorrelation
+time; the run is extended until it passes. Short runs underestimate the
+correlation time, so this only catches levels that are clearly unrelaxed.
+production.lammps is only written from a level that passed; it discards
+an initial block before sampling, and its avg_Rg2.dat is re-checked with
+`python multiscale.py --check avg_Rg2.dat`.
+
+Levels are given as beads per edge, e.g. [2, 5, 10]. Each level writes
+level_N.data / level_N.lammps and LAMMPS writes relaxed_N.data.
+"""
+
+import subprocess
+import sys
+from collections import defaultdict
+import numpy as np
+
+from visualize_ovito import parse_lammps_data, augment_data, write_augmented_data
+
+# --- Configuration ---
+original_data_file = 'basic.data'          # coarse 6-node skeleton
+levels = [2, 5, 10]                        # beads per edge, coarse -> fine
+arc_height = 1.5                           # arc height of the coarse embedding
+flory_nu = 0.588                           # size scaling when refining (good solvent)
+coarse_steps = 20000                       # NVT steps at the coarsest level
+refine_steps = 5000                        # NVT steps after each refinement
+warm_steps = 500                           # soft warm-up steps per level
+rg_every = 10                              # steps between Rg² samples for the drift check
+drift_z = 2.5                              # max Rg² drift (in SE) to accept a level
+min_tau_span = 5                           # each compared quarter must span this many tau
+min_samples = 50                           # and hold at least this many samples
+discard_steps = 25000                      # production steps dropped before sampling
+                                           # (~5 Rg² correlation times at N=10, 96 beads)
+max_extensions = 8                         # extra NVT blocks before giving up
+lmp_cmd = ['lmp']                          # e.g. ['mpirun', '-np', '4', 'lmp']
+# --- End Configuration ---
+
+
+def trace_edges(atoms, bonds):
+    """Split the bead graph into junction-to-junction paths.
+
+    Junctions are type-1 atoms (the skeleton nodes kept by augment_data) or
+    any atom whose degree is not 2. Returns list of atom-id paths.
+    """
+    types = {a['id']: a['type'] for a in atoms}
+    incident = defaultdict(list)
+    for b in bonds:
+        incident[b['a1']].append((b['id'], b['a2']))
+        incident[b['a2']].append((b['id'], b['a1']))
+    is_node = {i: types[i] == 1 or len(incident[i]) != 2 for i in types}
+
+    used, paths = set(), []
+    for start in sorted(i for i in types if is_node[i]):
+        for bid, nxt in incident[start]:
+            if bid in used:
+                continue
+            used.add(bid)
+            path = [start, nxt]
+            while not is_node[path[-1]]:
+                cur = path[-1]
+                bid2, nxt2 = next((b, n) for b, n in incident[cur] if b not in used)
+                used.add(bid2)
+                path.append(nxt2)
+            paths.append(path)
+    return paths
+
+
+def resample_path(points, n):
+    """n points spaced uniformly in arc length strictly between the ends."""
+    seg = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    s = np.concatenate([[0.0], np.cumsum(seg)])
+    t = s[-1] * np.arange(1, n + 1) / (n + 1.0)
+    return np.column_stack([np.interp(t, s, points[:, k]) for k in range(3)])
+
+
+def refine_data(data, n_old, n_new, nu=flory_nu):
+    """Insert n_new beads per edge along the relaxed paths of `data`.
+
+    Positions are first scaled about the centre of mass by
+    ((n_new + 1) / (n_old + 1))**nu, a rough Flory guess for the overall
+    size. The contour still shrinks relative to the new bead count, so the
+    inserted bonds start compressed (well below r0 = 1.2); the soft
+    warm-up and minimisation of the next level stretch them back before
+    any NVT run.
+    """
+    pos = {a['id']: a['pos'] for a in data['atoms']}
+    com = np.mean(list(pos.values()), axis=0)
+    scale = ((n_new + 1.0) / (n_old + 1.0)) ** nu
+
+    paths = trace_edges(data['atoms'], data['bonds'])
+    nodes = sorted({p[0] for p in paths} | {p[-1] for p in paths})
+    node_id = {old: i + 1 for i, old in enumerate(nodes)}
+
+    new_atoms = [{'id': node_id[i], 'mol': 1, 'type': 1,
+                  'pos': com + scale * (pos[i] - com)} for i in nodes]
+    new_bonds = []
+    current_atom_id, current_bond_id = len(nodes), 0
+    for path in paths:
+        points = com + scale * (np.array([pos[i] for i in path]) - com)
+        dummy_ids = []
+        for p in resample_path(points, n_new):
+            current_atom_id += 1
+            dummy_ids.append(current_atom_id)
+            new_atoms.append({'id': current_atom_id, 'mol': 1, 'type': 2, 'pos': p})
+
+        chain_atoms = [node_id[path[0]]] + dummy_ids + [node_id[path[-1]]]
+        for i in range(len(chain_atoms) - 1):
+            current_bond_id += 1
+            new_bonds.append({'id': current_bond_id, 'type': 1,
+                              'a1': chain_atoms[i], 'a2': chain_atoms[i + 1]})
+
+    return new_atoms, new_bonds
+
+
+def write_level_input(filename, data_file, relaxed_file, nvt_steps, rg_file, warm=True):
+    """LAMMPS input for one level (same force field as spectacle.lammps).
+
+    With warm=True the structure gets the soft warm-up and minimisation
+    first; warm=False just continues NVT from a relaxed file (velocities
+    are read from it). Rg² is written every rg_every steps to rg_file for
+    the convergence check.
+    """
+    with open(filename, 'w') as f:
+        f.write(f"""# Multiscale level (harmonic bonds + LJ excluded volume)
+units       real
+dimension   3
+atom_style  bond
+boundary    p p p
+
+log             log.{relaxed_file}
+
+# ==== Interactions ====
+# styles must exist before read_data: relaxed_N.data may carry Coeffs sections
+pair_style      lj/cut 8.0
+bond_style      harmonic
+
+# ==== Input Structure ====
+read_data       {data_file}
+
+pair_coeff      * * 0.1 3.0
+bond_coeff      * 300.0 1.2
+
+neighbor        1.0 bin
+neigh_modify    delay 0 every 1 check yes
+""")
+        if warm:
+            f.write(f"""
+# ==== Short soft warm-up (inserted beads only overlap locally) ====
+pair_style      soft 5.0
+pair_coeff      * * 5.0
+fix             warm all adapt 1 pair soft a * * v_f
+
+variable        f equal ramp(0,1)
+run             {warm_steps}
+unfix warm
+
+pair_style      lj/cut 8.0
+pair_coeff      * * 0.1 3.0
+
+# ==== Energy Minimization ====
+reset_timestep 0
+min_style cg
+minimize 1.0e-6 1.0e-8 5000 10000
+
+velocity all create 300.0 12345 mom yes rot yes dist gaussian
+""")
+        f.write(f"""
+# ==== Equilibration ====
+reset_timestep 0
+fix       1 all nvt temp 300.0 300.0 100.0
+
+compute     rg all gyration
+variable    Rg2 equal c_rg*c_rg
+fix         rgeq all ave/time {rg_every} 1 {rg_every} v_Rg2 file {rg_file}
+
+thermo      1000
+run         {nvt_steps}
+
+# ==== Save relaxed structure (velocities kept, coeffs set by the inputs) ====
+write_data  {relaxed_file} nocoeff
+""")
+
+
+def write_production_input(filename, data_file, discard=None):
+    """Production run (as in spectacle.lammps) from an equilibrated structure.
+
+    The first `discard` NVT steps run before Rg² sampling starts, so a short
+    per-level equilibration does not leak into avg_Rg2.dat.
+    """
+    discard = discard_steps if discard is None else discard
+    with open(filename, 'w') as f:
+        f.write(f"""# Multiscale production (harmonic bonds + LJ excluded volume)
+units       real
+dimension   3
+atom_style  bond
+boundary    p p p
+
+log             log.production
+
+# ==== Interactions ====
+pair_style      lj/cut 8.0
+bond_style      harmonic
+
+# ==== Input Structure (equilibrated, with velocities) ====
+read_data       {data_file}
+
+pair_coeff      * * 0.1 3.0
+bond_coeff      * 300.0 1.2
+
+neighbor        1.0 bin
+neigh_modify    delay 0 every 1 check yes
+
+fix       1 all nvt temp 300.0 300.0 100.0
+thermo      1000
+
+# ==== Discarded block (not sampled) ====
+run         {discard}
+reset_timestep 0
+
+# ==== Compute Rg & Rg^2 ====
+compute     rg all gyration
+variable    Rg2 equal c_rg*c_rg
+
+fix         rgavg all ave/time 100 10 1000 v_Rg2 file avg_Rg2.dat
+
+# ==== Output ====
+dump        1 all custom 100 dump.lammpstrj id type x y z
+thermo_style custom step temp pe ke etotal press c_rg v_Rg2
+
+run         500000
+
+# ==== Save relaxed structure ====
+write_data  relaxed.data
+""")
+
+
+def autocorr_time(x, c=5.0):
+    """Statistical inefficiency g = 1 + 2 sum(rho_t) of a series.
+
+    The sum is cut with Sokal's window (smallest M with M >= c * g(M)), so
+    var(mean) ~ var(x) * g / n for correlated samples.
+    """
+    x = np.asarray(x, dtype=float) - np.mean(x)
+    n = len(x)
+    if n < 2 or not np.any(x):
+        return 1.0
+    f = np.fft.rfft(x, 2 * n)
+    acf = np.fft.irfft(f * np.conj(f))[:n]
+    rho = acf / acf[0]
+    g = 1.0 + 2.0 * np.cumsum(rho[1:])
+    window = np.nonzero(np.arange(1, n) >= c * g)[0]
+    return max(1.0, g[window[0]] if len(window) else g[-1])
+
+
+def check_drift(rg2, z_max=drift_z, min_span=min_tau_span):
+    """Test the Rg² series for drift between the last two quarters.
+
+    The first half is dropped as transient. The two quarter means are
+    compared with standard errors built from the autocorrelation time, so
+    correlated but stationary series are not rejected.
+    Each quarter must cover min_span autocorrelation times and hold
+    min_samples samples; otherwise the series is too short.
+
+    On short level runs g is underestimated (for the 96-bead spectacle a
+    500-sample window gives ~200 steps against ~5000 from a 400k-step run),
+    so this is a gross check against unrelaxed levels; the long production
+    series is re-checked by check_production.
+
+    Returns (status, z, g, needed) with status 'ok', 'drift' or 'short', g
+    the statistical inefficiency in samples and needed the total number of
+    samples a conclusive test would need.
+    """
+    tail = np.asarray(rg2, dtype=float)[len(rg2) // 2:]
+    half = len(tail) // 2
+    if half < min_samples:
+        return 'short', np.nan, np.nan, 4 * min_samples
+    a, b = tail[:half], tail[half:2 * half]
+    # g from the whole tail (short windows underestimate it); variances about
+    # each quarter's own mean, so a shift between the quarters is not noise
+    g = autocorr_time(tail)
+    needed = int(np.ceil(4 * max(min_span * g, min_samples)))
+    if half < min_span * g:
+        return 'short', np.nan, g, needed
+    se2 = (a.var(ddof=1) + b.var(ddof=1)) * g / half
+    z = abs(b.mean() - a.mean()) / max(np.sqrt(se2), 1e-12)
+    return ('ok' if z < z_max else 'drift'), z, g, needed
+
+
+def check_production(rg_file='avg_Rg2.dat'):
+    """Drift check on the production Rg² series (long enough to estimate g)."""
+    rg2 = np.loadtxt(rg_file, comments='#', ndmin=2)[:, 1]
+    status, z, g, _ = check_drift(rg2)
+    print(f"Production '{rg_file}': Rg² drift z = {z:.2f}, g = {g:.1f} samples, "
+          f"{len(rg2)} samples ({status})")
+    return status == 'ok'
+
+
+def run_lammps(input_file):
+    """Run one level with LAMMPS."""
+    try:
+        subprocess.run(lmp_cmd + ['-in', input_file], check=True)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        print(f"❌ Error: LAMMPS failed on '{input_file}': {e}")
+        sys.exit(1)
+
+
+def equilibrate_level(n, data_file, steps, warm=True):
+    """Run one level, extending NVT until the Rg² drift check passes.
+
+    Extensions continue from relaxed_N.data and their Rg² series are
+    appended, so the test always sees the whole run. A series that is too
+    short to test is extended to the length the test needs.
+    Returns (relaxed data file, MD steps actually run).
+    """
+    relaxed_file = f"relaxed_{n}.data"
+    input_file, rg_file = f"level_{n}.lammps", f"eq_Rg2_{n}.dat"
+    write_level_input(input_file, data_file, relaxed_file, steps, rg_file, warm)
+    print(f"=== Level N={n}: {steps} NVT steps ===")
+    run_lammps(input_file)
+    done = warm_steps + steps
+    series = [np.loadtxt(rg_file, comments='#', ndmin=2)[:, 1]]
+
+    for extension in range(1, max_extensions + 1):
+        rg2 = np.concatenate(series)
+        status, z, g, needed = check_drift(rg2)
+        print(f"Level N={n}: Rg² drift z = {z:.2f}, g = {g * rg_every:.0f} steps, "
+              f"{len(rg2)} samples ({status})")
+        if status == 'ok':
+            return relaxed_file, done
+        ext_steps = steps
+        if status == 'short':
+            ext_steps = max(steps, (needed - len(rg2)) * rg_every)
+        input_file, rg_file = f"level_{n}_ext{extension}.lammps", f"eq_Rg2_{n}_ext{extension}.dat"
+        write_level_input(input_file, relaxed_file, relaxed_file, ext_steps, rg_file, warm=False)
+        print(f"=== Level N={n}: extending by {ext_steps} NVT steps ===")
+        run_lammps(input_file)
+        done += ext_steps
+        series.append(np.loadtxt(rg_file, comments='#', ndmin=2)[:, 1])
+
+    status, z, _, _ = check_drift(np.concatenate(series))
+    if status != 'ok':
+        print(f"❌ Error: level N={n} did not converge after {max_extensions} extensions "
+              f"({status}, z = {z:.2f}).")
+        sys.exit(1)
+    return relaxed_file, done
+
+
+def run_pipeline(levels):
+    """Equilibrate levels coarse -> fine, then write the production input.
+
+    Production only starts from a level that passed the drift check.
+    """
+    print(f"Parsing '{original_data_file}'...")
+    data = parse_lammps_data(original_data_file)
+    prev_n = None
+    total_steps = 0
+    for n in levels:
+        data_file = f"level_{n}.data"
+        if prev_n is None:
+            atoms, bonds = augment_data(data, n, arc_height)
+            steps = coarse_steps
+        else:
+            atoms, bonds = refine_data(data, prev_n, n)
+            steps = refine_steps
+        write_augmented_data(data_file, atoms, bonds, data['headers'], N=n)
+        relaxed_file, done = equilibrate_level(n, data_file, steps)
+        total_steps += done
+        data = parse_lammps_data(relaxed_file)
+        prev_n = n
+
+    write_production_input('production.lammps', relaxed_file)
+    print(f"Equilibration MD steps run over all levels: {total_steps} + {discard_steps} "
+          f"discarded in production (fixed protocol: {2000 + 100000} for the final "
+          f"resolution alone)")
+    print(f"Wrote production.lammps (reads {relaxed_file}); run with: lmp -in production.lammps, "
+          f"then check it with: python multiscale.py --check avg_Rg2.dat")
+    return relaxed_file
+
+
+# --- Main ---
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--check':
+        ok = check_production(*sys.argv[2:3])
+        sys.exit(0 if ok else 1)
+    if len(sys.argv) > 1:
+        levels = [int(v) for v in sys.argv[1:]]
+    run_pipeline(levels)
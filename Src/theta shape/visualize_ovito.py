@@ -26,7 +26,7 @@ def parse_lammps_data(filename):
 
     section = None
     try:
-        with open(filename, 'r') as f:
+        with open(filename, 'r', errors='replace') as f:
             for raw in f:
                 line = raw.strip()
                 if not line or line.startswith('#'):
@@ -84,6 +84,16 @@ def parse_lammps_data(filename):
                         x, y, z = float(tokens[2]), float(tokens[3]), float(tokens[4])
                     else:
                         continue
+                    # unwrap using image flags (write_data output)
+                    if len(tokens) >= 9 and None not in (data['headers']['x'],
+                                                         data['headers']['y'],
+                                                         data['headers']['z']):
+                        (xlo, xhi), (ylo, yhi), (zlo, zhi) = (data['headers']['x'],
+                                                              data['headers']['y'],
+                                                              data['headers']['z'])
+                        x += int(tokens[6]) * (xhi - xlo)
+                        y += int(tokens[7]) * (yhi - ylo)
+                        z += int(tokens[8]) * (zhi - zlo)
                     data['atoms'].append({'id': atom_id, 'mol': mol_id, 'type': atom_type,
                                           'pos': np.array([x, y, z], dtype=float)})
 
@@ -191,11 +201,12 @@ def augment_data(data, N, h):
     return new_atoms, new_bonds
 
 
-def write_augmented_data(filename, atoms, bonds, headers):
+def write_augmented_data(filename, atoms, bonds, headers, N=None):
     """Write new augmented data file."""
     total_atoms, total_bonds = len(atoms), len(bonds)
+    N = dummy_atoms_per_bond if N is None else N
     with open(filename, 'w') as f:
-        f.write(f"LAMMPS data file - Spectacle (N={dummy_atoms_per_bond})\n\n")
+        f.write(f"LAMMPS data file - Spectacle (N={N})\n\n")
         f.write(f"{total_atoms} atoms\n{total_bonds} bonds\n0 angles\n\n")
         f.write(f"2 atom types\n{headers.get('bond types', 1)} bond types\n\n")
 